@@ -29,6 +29,8 @@ import re
 import logging
 logger = logging.getLogger(__name__)
 
+_ANSI_ESCAPE = re.compile(r'\x1b[^m]*m')
+
 
 def parseGctfOutput(filename):
     """ Retrieve defocus U, V, angle, crossCorrelation
@@ -38,30 +40,28 @@ def parseGctfOutput(filename):
     if os.path.exists(filename):
         # Create an empty list with: defU, defV, angle, CC and resolution
         result = [0.] * 6
-        ansi_escape = re.compile(r'\x1b[^m]*m')
-        f = open(filename)
-        for line in f:
-            if 'Final Values' in line:
-                parts = line.strip().split()
-                # line = DefocusU, DefocusV, Angle, crossCorrelation, Final, Values
-                # OR
-                # line = DefocusU, DefocusV, Angle, ctfPhaseShift, crossCorrelation, Final, Values
-                # Always map defU, defV and angle
-                result[0:3] = map(float, parts[0:3])
+        with open(filename) as f:
+            for line in f:
+                if 'Final Values' in line:
+                    parts = line.strip().split()
+                    # line = DefocusU, DefocusV, Angle, crossCorrelation, Final, Values
+                    # OR
+                    # line = DefocusU, DefocusV, Angle, ctfPhaseShift, crossCorrelation, Final, Values
+                    # Always map defU, defV and angle
+                    result[0:3] = map(float, parts[0:3])
 
-                if parts[4] == 'Final':  # no ctfPhaseShift
-                    result[3] = float(parts[3])
-                else:
-                    result[3] = float(parts[4])  # CC is now in position 4
-                    result[4] = float(parts[3])  # get ctfPhaseShift
-            if 'Resolution limit estimated by EPA' in line:
-                # Take ctfResolution as a tuple
-                # that is the last value in the line
-                # but remove escape characters first
-                resol = ansi_escape.sub('', line)
-                result[5] = float(resol.strip().split()[-1])
-                break
-        f.close()
+                    if parts[4] == 'Final':  # no ctfPhaseShift
+                        result[3] = float(parts[3])
+                    else:
+                        result[3] = float(parts[4])  # CC is now in position 4
+                        result[4] = float(parts[3])  # get ctfPhaseShift
+                if 'Resolution limit estimated by EPA' in line:
+                    # Take ctfResolution as a tuple
+                    # that is the last value in the line
+                    # but remove escape characters first
+                    resol = _ANSI_ESCAPE.sub('', line)
+                    result[5] = float(resol.strip().split()[-1])
+                    break
     else:
         result = None
         logger.warning(f"Warning: Missing file: {filename}")
@@ -34,6 +34,17 @@ from gctf.convert.convert import readCtfModel, parseGctfOutput
 from gctf.constants import CCC
 
 
+# Arguments filled from the CTF params dict in a single formatting pass
+# when the command is requested (see ProgramGctf.getCommand)
+CTF_PARAMS_ARGS = ("--apix %(samplingRate)f --kV %(voltage)f "
+                   "--cs %(sphericalAberration)f --ac %(ampContrast)f "
+                   "--dstep %(scannedPixelSize)f --defL %(minDefocus)f "
+                   "--defH %(maxDefocus)f --defS %(step_focus)f "
+                   "--resL %(lowRes)f --resH %(highRes)f "
+                   "--boxsize %(windowSize)d "
+                   "--gid %%(GPU)s")  # Use %% to escape when formatting
+
+
 class ProgramGctf:
     """
     Wrapper of Gctf program that will handle parameters definition
@@ -250,6 +261,18 @@ class ProgramGctf:
 
         form.addParallelSection(threads=1, mpi=1)
 
+    @classmethod
+    def validateGpuParams(cls, protocol):
+        """ Return the errors found in the protocol GPU settings. """
+        errors = []
+        nprocs = max(protocol.numberOfMpi.get(), protocol.numberOfThreads.get())
+
+        if nprocs < len(protocol.getGpuList()):
+            errors.append("Multiple GPUs can not be used by a single process. "
+                          "Make sure you specify more processors than GPUs. ")
+
+        return errors
+
     def getExt(self):
         return self._ext
 
@@ -293,45 +316,33 @@ class ProgramGctf:
         params['maxDefocus'] = protocol.maxDefocus.get()
         params['step_focus'] = protocol.stepDefocus.get()
 
-        args = " --apix %(samplingRate)f "
-        args += "--kV %(voltage)f "
-        args += "--cs %(sphericalAberration)f "
-        args += "--ac %(ampContrast)f "
-        args += "--dstep %(scannedPixelSize)f "
-        args += "--defL %(minDefocus)f "
-        args += "--defH %(maxDefocus)f "
-        args += "--defS %(step_focus)f "
-        args += "--astm %f " % protocol.astigmatism
-        args += "--resL %(lowRes)f "
-        args += "--resH %(highRes)f "
-        args += "--do_EPA %d " % (1 if protocol.doEPA else 0)
-        args += "--boxsize %(windowSize)d "
-        args += "--plot_res_ring %d " % (1 if protocol.plotResRing else 0)
-        args += "--gid %%(GPU)s "  # Use %% to escape when formatting
-        args += "--bfac %d " % protocol.bfactor
-        args += "--B_resH %f " % (2 * params['samplingRate'])
-        args += "--overlap %f " % protocol.overlap
-        args += "--convsize %d " % protocol.convsize
-        args += "--do_Hres_ref %d " % (1 if protocol.doHighRes else 0)
-        args += "--smooth_resL %d " % protocol.smoothResL
-        args += "--EPA_oversmp %d " % protocol.EPAsmp
+        args = [CTF_PARAMS_ARGS,
+                f"--astm {protocol.astigmatism.get():f}",
+                f"--do_EPA {protocol.doEPA.get():d}",
+                f"--plot_res_ring {protocol.plotResRing.get():d}",
+                f"--bfac {protocol.bfactor.get():d}",
+                f"--B_resH {2 * params['samplingRate']:f}",
+                f"--overlap {protocol.overlap.get():f}",
+                f"--convsize {protocol.convsize.get():d}",
+                f"--do_Hres_ref {protocol.doHighRes.get():d}",
+                f"--smooth_resL {protocol.smoothResL.get():d}",
+                f"--EPA_oversmp {protocol.EPAsmp.get():d}"]
 
         if protocol.doPhShEst:
-            args += "--phase_shift_L %f " % protocol.phaseShiftL
-            args += "--phase_shift_H %f " % protocol.phaseShiftH
-            args += "--phase_shift_S %f " % protocol.phaseShiftS
-            args += "--phase_shift_T %d " % (1 + protocol.phaseShiftT.get())
-
-            args += ("--cosearch_refine_ps %d "
-                     % (1 if protocol.coSearchRefine else 0))
-            args += "--refine_2d_T %d " % protocol.refine2DT
+            args.extend([
+                f"--phase_shift_L {protocol.phaseShiftL.get():f}",
+                f"--phase_shift_H {protocol.phaseShiftH.get():f}",
+                f"--phase_shift_S {protocol.phaseShiftS.get():f}",
+                f"--phase_shift_T {1 + protocol.phaseShiftT.get():d}",
+                f"--cosearch_refine_ps {protocol.coSearchRefine.get():d}",
+                f"--refine_2d_T {protocol.refine2DT.get():d}"])
 
         if protocol.doHighRes:
-            args += "--Href_resL %0.3f " % protocol.HighResL
-            args += "--Href_resH %0.3f " % protocol.HighResH
-            args += "--Href_bfac %d " % protocol.HighResBf
+            args.extend([
+                f"--Href_resL {protocol.HighResL.get():0.3f}",
+                f"--Href_resH {protocol.HighResH.get():0.3f}",
+                f"--Href_bfac {protocol.HighResBf.get():d}"])
 
-        args += ("--ctfstar NONE --do_validation %d "
-                 % (1 if protocol.doValidate else 0))
+        args.append(f"--ctfstar NONE --do_validation {protocol.doValidate.get():d}")
 
-        return args, params
+        return " ".join(args), params
@@ -25,6 +25,7 @@
 # **************************************************************************
 
 import os
+import shlex
 
 import pyworkflow.utils as pwutils
 from pyworkflow.object import Boolean
@@ -72,6 +73,15 @@ class ProtGctf(ProtCTFMicrographs):
 
             pwutils.makePath(micPath)
             ih = emlib.image.ImageHandler()
+            # Read the parameters once, they are the same for all micrographs
+            downFactor = self.ctfDownFactor.get()
+            if downFactor != 1:
+                kwargs['scannedPixelSize'] = self._params['scannedPixelSize'] * downFactor
+            ext = self._gctfProgram.getExt()
+            micFnList = []  # (micFn, micBase) of the micrographs to estimate
+
+            def _getFile(micBase, suffix):
+                return os.path.join(micPath, micBase + suffix)
 
             for mic in micList:
                 micFn = mic.getFileName()
@@ -81,41 +91,38 @@ class ProtGctf(ProtCTFMicrographs):
                     self.error("Missing input micrograph: %s. Skipping..." % micFn)
                     continue
 
-                downFactor = self.ctfDownFactor.get()
-                micFnMrc = os.path.join(micPath, pwutils.replaceBaseExt(micFn, 'mrc'))
+                micBase = self._getMicBase(micFn)
+                micFnMrc = _getFile(micBase, '.mrc')
+                micFnList.append((micFn, micBase))
 
                 if downFactor != 1:
                     # Replace extension by 'mrc' cause there are some formats
                     # that cannot be written (such as dm3)
                     ih.scaleFourier(micFn, micFnMrc, downFactor)
-                    sps = self._params['scannedPixelSize'] * downFactor
-                    kwargs['scannedPixelSize'] = sps
                 else:
-                    if micFn.endswith('.mrc'):
+                    # .mrc files, and single float32 .mrcs/.st ones, are read by Gctf as is
+                    if micFn.endswith('.mrc') or self._isSingleFloatMrc(ih, micFn):
                         pwutils.createAbsLink(os.path.abspath(micFn), micFnMrc)
                     else:
                         ih.convert(micFn, micFnMrc, emlib.DT_FLOAT)
 
+            if not micFnList:
+                # All input micrographs are missing, nothing to run Gctf on
+                pwutils.cleanPath(micPath)
+                return
+
             program, params = self._gctfProgram.getCommand(**kwargs)
-            params += ' %s/*.mrc' % micPath
+            params += ' ' + ' '.join(shlex.quote(_getFile(micBase, '.mrc'))
+                                     for _, micBase in micFnList)
             self.runJob(program, params, env=Plugin.getEnviron())
 
-            def _getFile(micBase, suffix):
-                return os.path.join(micPath, micBase + suffix)
-
-            for mic in micList:
-                micFn = mic.getFileName()
-
-                if not os.path.exists(micFn):
-                    continue
-
-                micBase = pwutils.removeBaseExt(micFn)
+            for micFn, micBase in micFnList:
                 micFnMrc = _getFile(micBase, '.mrc')
                 # Let's clean the temporary mrc micrograph
                 pwutils.cleanPath(micFnMrc)
 
                 # move output from tmp to extra
-                micFnCtf = _getFile(micBase, self._gctfProgram.getExt())
+                micFnCtf = _getFile(micBase, ext)
                 micFnCtfLog = _getFile(micBase, '_gctf.log')
                 micFnCtfFit = _getFile(micBase, '_EPA.log')
 
@@ -130,7 +137,7 @@ class ProtGctf(ProtCTFMicrographs):
             pwutils.cleanPath(micPath)
 
         except:
-            self.error("ERROR: Gctf has failed for %s/*.mrc" % micPath)
+            self.error("ERROR: Gctf has failed for %s" % micPath)
             import traceback
             traceback.print_exc()
 
@@ -154,14 +161,7 @@ class ProtGctf(ProtCTFMicrographs):
 
     # -------------------------- INFO functions -------------------------------
     def _validate(self):
-        errors = []
-        nprocs = max(self.numberOfMpi.get(), self.numberOfThreads.get())
-
-        if nprocs < len(self.getGpuList()):
-            errors.append("Multiple GPUs can not be used by a single process. "
-                          "Make sure you specify more processors than GPUs. ")
-
-        return errors
+        return ProgramGctf.validateGpuParams(self)
 
     def _methods(self):
         if self.inputMicrographs.get() is None:
@@ -177,17 +177,35 @@ class ProtGctf(ProtCTFMicrographs):
         return [methods]
 
     # -------------------------- UTILS functions ------------------------------
+    @staticmethod
+    def _isSingleFloatMrc(ih, micFn):
+        """ Return True if micFn is a .mrcs or .st file holding a single
+        float32 image, that can be passed to Gctf without conversion.
+        """
+        if not micFn.endswith(('.mrcs', '.st')):
+            return False
+
+        x, y, z, n = ih.getDimensions(micFn)
+        return z * n == 1 and ih.getDataType(micFn) == emlib.DT_FLOAT
+
+    @staticmethod
+    def _getMicBase(micFn):
+        """ Return the micrograph filename without folder and extension,
+        used to name both the temporary and the output files. """
+        return os.path.splitext(os.path.basename(micFn))[0]
+
+    def _getMicExtraPath(self, micFn, suffix):
+        """ Return the extra path for micFn with the given suffix. """
+        return self._getExtraPath(self._getMicBase(micFn) + suffix)
+
     def _getPsdPath(self, micFn):
-        micFnBase = pwutils.removeBaseExt(micFn)
-        return self._getExtraPath(micFnBase + '_ctf.mrc')
+        return self._getMicExtraPath(micFn, '_ctf.mrc')
 
     def _getCtfOutPath(self, micFn):
-        micFnBase = pwutils.removeBaseExt(micFn)
-        return self._getExtraPath(micFnBase + '_ctf.log')
+        return self._getMicExtraPath(micFn, '_ctf.log')
 
     def _getCtfFitOutPath(self, micFn):
-        micFnBase = pwutils.removeBaseExt(micFn)
-        return self._getExtraPath(micFnBase + '_ctf_EPA.log')
+        return self._getMicExtraPath(micFn, '_ctf_EPA.log')
 
     def _parseOutput(self, filename):
         """ Try to find the output estimation parameters
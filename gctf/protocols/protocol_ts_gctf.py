@@ -25,6 +25,8 @@
 # **************************************************************************
 
 import os
+import shlex
+from concurrent.futures import ThreadPoolExecutor
 from enum import Enum
 
 from pyworkflow.object import Set, Boolean
@@ -61,7 +63,9 @@ class ProtTsGctf(EMProtocol):
         self._gctfProgram = None
         self.inTsSet = None
         self.tsDict = None
+        self.tiDict = None
         self._params = None
+        self._downFactor = None
         self.ih = None
 
     # -------------------------- DEFINE param functions -----------------------
@@ -82,6 +86,14 @@ class ProtTsGctf(EMProtocol):
                            'concentrated at the origin (too small to be seen) '
                            'and not occupying the whole power spectrum (since '
                            'this downsampling might entail aliasing).')
+        form.addParam('batchSize', params.IntParam,
+                      default=10, validators=[params.Positive],
+                      expertLevel=params.LEVEL_ADVANCED,
+                      label='Tilt-images per Gctf run',
+                      help='Number of tilt-images of a tilt-series that are '
+                           'estimated with a single Gctf execution. Larger '
+                           'values reduce the overhead of launching the '
+                           'program for every tilt-image.')
 
         ProgramGctf.defineProcessParams(form)
 
@@ -100,27 +112,48 @@ class ProtTsGctf(EMProtocol):
     def _initialize(self):
         self.ih = ImageHandler()
         self.inTsSet = self._getInputTs()
+        self._downFactor = self.getAttributeValue('ctfDownFactor', 1.0)
         self._params = createCtfParams(self.inTsSet, self.windowSize.get(),
                                        self.lowRes.get(), self.highRes.get(),
                                        self.minDefocus.get(), self.maxDefocus.get(),
-                                       downFactor=self.getAttributeValue('ctfDownFactor', 1.0))
+                                       downFactor=self._downFactor)
         self._gctfProgram = ProgramGctf(self)
-        self.tsDict = {ts.getTsId(): ts.clone(ignoreAttrs=[]) for ts in self.inTsSet.iterItems()}
+        self.tsDict = {}
+        self.tiDict = {}  # cloned tilt-images of each ts, to iterate them only once
+        for ts in self.inTsSet.iterItems():
+            tsId = ts.getTsId()
+            self.tsDict[tsId] = ts.clone(ignoreAttrs=[])
+            self.tiDict[tsId] = [ti.clone() for ti in ts.iterItems()]
 
     def processTiltSeriesStep(self, tsId):
-        ts = self.tsDict[tsId]
-        for ti in ts.iterItems():
-            workingDir = self._getTiWorkingDir(ti)
-            tiFnMrc = os.path.join(workingDir, self.getTiPrefix(ti) + '.mrc')
-            pwutils.makePath(workingDir)
-            self._convertInputTi(ti, tiFnMrc)
-            self._estimateCtf(workingDir, tiFnMrc)
+        tiList = self.tiDict[tsId]
+        batchSize = self.batchSize.get()
+        batches = [tiList[i:i + batchSize] for i in range(0, len(tiList), batchSize)]
+        if not batches:
+            return
+
+        # Convert the next batch while Gctf is running on the current one
+        with ThreadPoolExecutor(max_workers=1) as pool:
+            future = pool.submit(self._convertInputBatch, batches[0])
+            for i in range(len(batches)):
+                workingDir, tiFnList = future.result()
+                if i + 1 < len(batches):
+                    future = pool.submit(self._convertInputBatch, batches[i + 1])
+                self._estimateCtfList(workingDir, tiFnList)
 
     def createOutputStep(self, tsId):
+        ts = self.tsDict[tsId]
+        # Parse the ti CTFs before taking the lock, it only reads the Gctf logs
+        ctfTomoList = []
+        for tiltImage in self.tiDict[tsId]:
+            ctfTomo = self.getCtf(tiltImage)
+            ctfTomo.setIndex(tiltImage.getIndex())
+            ctfTomo.setAcquisitionOrder(tiltImage.getAcquisitionOrder())
+            ctfTomoList.append(ctfTomo)
+
         with self._lock:
             outCtfSet = self.getOutputCtfTomoSet()
             # Generate the current CTF tomo series item
-            ts = self.tsDict[tsId]
             newCTFTomoSeries = CTFTomoSeries()
             newCTFTomoSeries.copyInfo(ts)
             newCTFTomoSeries.setTiltSeries(ts)
@@ -128,11 +161,8 @@ class ProtTsGctf(EMProtocol):
             newCTFTomoSeries.setTsId(ts.getTsId())
             outCtfSet.append(newCTFTomoSeries)
 
-            # Generate the ti CTF and populate the corresponding CTF tomo series
-            for i, tiltImage in enumerate(ts.iterItems()):
-                ctfTomo = self.getCtf(tiltImage)
-                ctfTomo.setIndex(tiltImage.getIndex())
-                ctfTomo.setAcquisitionOrder(tiltImage.getAcquisitionOrder())
+            # Populate the corresponding CTF tomo series
+            for ctfTomo in ctfTomoList:
                 newCTFTomoSeries.append(ctfTomo)
 
             outCtfSet.update(newCTFTomoSeries)
@@ -143,8 +173,7 @@ class ProtTsGctf(EMProtocol):
 
     # --------------------------- INFO functions ------------------------------
     def _validate(self):
-        errors = []
-        return errors
+        return ProgramGctf.validateGpuParams(self)
 
     # --------------------------- UTILS functions ----------------------------
     def getCtf(self, ti: TiltImage) -> CTFTomo:
@@ -157,42 +186,64 @@ class ProtTsGctf(EMProtocol):
 
         return ctfTomo
 
-    def _estimateCtf(self, workingDir, tiFn):
+    def _estimateCtfList(self, workingDir, tiFnList):
+        """ Estimate the CTF of all the tilt-images converted into
+        workingDir with a single Gctf execution. """
+        program, args = self._gctfProgram.getCommand(
+            scannedPixelSize=self._params['scannedPixelSize'])
+        args += ' ' + ' '.join(shlex.quote(tiFn) for tiFn, _ in tiFnList)
         try:
-            program, args = self._gctfProgram.getCommand(
-                scannedPixelSize=self._params['scannedPixelSize'])
-            args += ' %s/*.mrc' % workingDir
             self.runJob(program, args, env=Plugin.getEnviron())
-
-            ext = self._gctfProgram.getExt()
-
-            # Move files we want to keep
-            micBase = pwutils.removeBaseExt(tiFn)
-
-            def _getFile(suffix):
-                return os.path.join(workingDir, micBase + suffix)
-
-            # move output from tmp to extra
-            pwutils.moveFile(_getFile(ext),
-                             self._getExtraPath(micBase + '_ctf.mrc'))
-            pwutils.moveFile(_getFile('_gctf.log'), self._getTmpPath())
-            pwutils.moveFile(_getFile('_EPA.log'),
-                             self._getExtraPath())
-
         except Exception:
-            self.error("ERROR: Gctf has failed for %s" % tiFn)
+            # Keep the results of the tilt-images estimated before the failure
+            self.error("ERROR: Gctf has failed for %s" % workingDir)
+
+        ext = self._gctfProgram.getExt()
+
+        def _getFile(tiBase, suffix):
+            return os.path.join(workingDir, tiBase + suffix)
+
+        for tiFn, tiBase in tiFnList:
+            # Move files we want to keep, from tmp to extra
+            outputs = [(_getFile(tiBase, ext), self._getExtraPath(tiBase + '_ctf.mrc')),
+                       (_getFile(tiBase, '_gctf.log'), self._getTmpPath()),
+                       (_getFile(tiBase, '_EPA.log'), self._getExtraPath())]
+            try:
+                for src, dst in outputs:
+                    if os.path.exists(src):
+                        pwutils.moveFile(src, dst)
+                    else:
+                        self.error("ERROR: Missing Gctf output %s" % src)
+            except Exception:
+                self.error("ERROR: Gctf outputs could not be moved for %s" % tiFn)
 
     def _getInputTs(self, pointer=False):
         if isinstance(self.inputTiltSeries.get(), SetOfCTFTomoSeries):
             return self.inputTiltSeries.get().getSetOfTiltSeries(pointer=pointer)
         return self.inputTiltSeries.get() if not pointer else self.inputTiltSeries
 
+    def _convertInputBatch(self, tiBatch):
+        """ Convert a batch of tilt-images into its own working folder.
+        Return the working folder and the (tiFn, tiBase) list of the
+        converted files.
+        """
+        workingDir = self._getTiWorkingDir(tiBatch[0])
+        pwutils.makePath(workingDir)
+        tiFnList = []
+        for ti in tiBatch:
+            tiBase = self.getTiPrefix(ti)
+            tiFnMrc = os.path.join(workingDir, tiBase + '.mrc')
+            self._convertInputTi(ti, tiFnMrc)
+            tiFnList.append((tiFnMrc, tiBase))
+
+        return workingDir, tiFnList
+
     def _convertInputTi(self, ti, tiFn):
         """ This function will convert the input tilt-image
         taking into account the downFactor.
         It can be overwritten in subclasses if another behaviour is required.
         """
-        downFactor = self.ctfDownFactor.get()
+        downFactor = self._downFactor
 
         if not self.ih.existsLocation(ti):
             raise Exception("Missing input file: %s" % ti)
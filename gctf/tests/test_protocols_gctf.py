@@ -23,6 +23,8 @@
 # *  e-mail address 'scipion@cnb.csic.es'
 # *
 # **************************************************************************
+import numpy as np
+
 from pwem.protocols import ProtImportMicrographs, ProtImportParticles
 from pyworkflow.utils import magentaStr
 from pyworkflow.tests import BaseTest, DataSet, setupTestProject
@@ -100,6 +102,18 @@ class TestGctfBase(BaseTest):
                                       voltage=300,
                                       magnification=56000)
 
+    def checkCtfValues(self, ctfSet, valuesList, samplingRate):
+        """ Compare the defocus U/V of the CTFs against the expected values
+        and the sampling rate of the associated micrographs. """
+        ctfValues = np.array([(ctf.getDefocusU(), ctf.getDefocusV(),
+                               ctf.getMicrograph().getSamplingRate())
+                              for ctf in ctfSet])
+        self.assertEqual(len(ctfValues), len(valuesList))
+        np.testing.assert_allclose(ctfValues[:, :2], valuesList,
+                                   rtol=0, atol=1000)
+        np.testing.assert_allclose(ctfValues[:, 2], samplingRate,
+                                   rtol=0, atol=0.001)
+
 
 class TestGctf(TestGctfBase):
     @classmethod
@@ -121,14 +135,7 @@ class TestGctf(TestGctfBase):
         valuesList = [[23918, 23521],
                       [22277, 21972],
                       [22464, 22488]]
-        for ctfModel, values in zip(protCTF.outputCTF, valuesList):
-            self.assertAlmostEquals(
-                ctfModel.getDefocusU(), values[0], delta=1000)
-            self.assertAlmostEquals(
-                ctfModel.getDefocusV(), values[1], delta=1000)
-            self.assertAlmostEquals(
-                ctfModel.getMicrograph().getSamplingRate(),
-                2.474, delta=0.001)
+        self.checkCtfValues(protCTF.outputCTF, valuesList, 2.474)
 
     def testRunGctf2(self):
         protCTF = ProtGctf()
@@ -141,11 +148,4 @@ class TestGctf(TestGctfBase):
         valuesList = [[23887, 23538],
                       [22281, 21925],
                       [22453, 22383]]
-        for ctfModel, values in zip(protCTF.outputCTF, valuesList):
-            self.assertAlmostEquals(
-                ctfModel.getDefocusU(), values[0], delta=1000)
-            self.assertAlmostEquals(
-                ctfModel.getDefocusV(), values[1], delta=1000)
-            self.assertAlmostEquals(
-                ctfModel.getMicrograph().getSamplingRate(),
-                1.237, delta=0.001)
+        self.checkCtfValues(protCTF.outputCTF, valuesList, 1.237)
@@ -71,7 +71,11 @@ with weakImport('tomo'):
 
     class TestGctfTsTCL(TestBaseCentralizedLayer):
         importedTs = None
+        refCtfs = None
         unbinnedSRate = DataSetRe4STATuto.unbinnedPixSize.value
+        minDefocus = 15000
+        maxDefocus = 50000
+        defocusTol = 1000  # Gctf refines the defocus after the grid search
 
         @classmethod
         def setUpClass(cls):
@@ -88,6 +92,8 @@ with weakImport('tomo'):
         @classmethod
         def _runPreviousProtocols(cls):
             cls.importedTs = cls._runImportTs()
+            # Reference estimation with the default batch size
+            cls.refCtfs = cls._runEstimateCtf(cls.importedTs)
 
         @classmethod
         def _runImportTs(cls, filesPattern=DataSetRe4STATuto.tsPattern.value,
@@ -112,14 +118,15 @@ with weakImport('tomo'):
             return tsImported
 
         @classmethod
-        def _runEstimateCtf(cls, inTsSet, objLabel=None):
+        def _runEstimateCtf(cls, inTsSet, objLabel=None, batchSize=10):
             print(magentaStr("\n==> Running the CTF estimation:"))
             protEstimateCtf = cls.newProtocol(ProtTsGctf,
                                               inputTiltSeries=inTsSet,
+                                              batchSize=batchSize,
                                               lowRes=50,
                                               highRes=4,
-                                              minDefocus=15000,
-                                              maxDefocus=50000)
+                                              minDefocus=cls.minDefocus,
+                                              maxDefocus=cls.maxDefocus)
             if objLabel:
                 protEstimateCtf.setObjLabel(objLabel)
             cls.launchProtocol(protEstimateCtf)
@@ -127,9 +134,43 @@ with weakImport('tomo'):
             return outTsSet
 
         def _checkCtfs(self, inCtfSet):
+            """ Check the output set and return the estimated defocus values
+            as a dict {(tsId, index): (defocusU, defocusV)}. """
             expectedSetSize = 2  # TS_03 and TS_54
             self.checkCTFs(inCtfSet, expectedSetSize=expectedSetSize)
 
+            tsSizes = {ts.getTsId(): ts.getSize() for ts in self.importedTs}
+            defocusDict = {}
+            for ctfSeries in inCtfSet.iterItems():
+                tsId = ctfSeries.getTsId()
+                self.assertEqual(ctfSeries.getSize(), tsSizes[tsId])
+                for ctfTomo in ctfSeries.iterItems():
+                    defocusDict[(tsId, ctfTomo.getIndex())] = (ctfTomo.getDefocusU(),
+                                                               ctfTomo.getDefocusV())
+
+            self.assertEqual(len(defocusDict), sum(tsSizes.values()))
+            return defocusDict
+
+        def _checkDefocusRange(self, defocusDict):
+            for defocusValues in defocusDict.values():
+                for defocus in defocusValues:
+                    self.assertGreaterEqual(defocus, self.minDefocus - self.defocusTol)
+                    self.assertLessEqual(defocus, self.maxDefocus + self.defocusTol)
+
         def testEstimateCtf01(self):
-            ctfs = self._runEstimateCtf(self.importedTs)
-            self._checkCtfs(ctfs)
+            self._checkCtfs(self.refCtfs)
+
+        def testEstimateCtf02(self):
+            # Smaller batches, so each tilt-series needs several Gctf runs
+            ctfs = self._runEstimateCtf(self.importedTs, objLabel='Gctf batch 7',
+                                        batchSize=7)
+            defocusDict = self._checkCtfs(ctfs)
+            self._checkDefocusRange(defocusDict)
+            # The batch size must not change the estimated values
+            refDefocusDict = self._checkCtfs(self.refCtfs)
+
+            self.assertEqual(defocusDict.keys(), refDefocusDict.keys())
+            for key, (defocusU, defocusV) in defocusDict.items():
+                refDefocusU, refDefocusV = refDefocusDict[key]
+                self.assertAlmostEqual(defocusU, refDefocusU, delta=10)
+                self.assertAlmostEqual(defocusV, refDefocusV, delta=10)
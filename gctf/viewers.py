@@ -25,6 +25,8 @@
 # **************************************************************************
 
 import os
+import functools
+import numpy as np
 from matplotlib.figure import Figure
 
 from pwem.emlib.image import ImageHandler
@@ -39,6 +41,11 @@ with pwutils.weakImport('tomo'):
 from gctf.protocols import ProtGctf, ProtTsGctf
 
 
+# Columns of the Gctf _EPA.log plotted against resolution (column 0)
+EPA_CURVES = [1, 4, 5]
+EPA_LEGEND = ['simulated CTF', 'equiphase avg. - bg', 'cross correlation']
+
+
 def createCtfPlot(ctfSet, ctfId):
     ctfModel = ctfSet[ctfId]
     psdFn = ctfModel.getPsdFile()
@@ -48,13 +55,8 @@ def createCtfPlot(ctfSet, ctfId):
     a = xplotter.createSubPlot(plot_title,
                                'Resolution (Angstroms)', 'CTF')
     a.invert_xaxis()
-    curves = [1, 4, 5]
-
-    for i in curves:
-        _plotCurve(a, i, fn)
-    xplotter.showLegend(['simulated CTF',
-                         'equiphase avg. - bg',
-                         'cross correlation'])
+    _plotCurves(a, EPA_CURVES, fn)
+    xplotter.showLegend(EPA_LEGEND)
     a.grid(True)
     xplotter.show()
 
@@ -64,19 +66,37 @@ OBJCMD_GCTF = "GCTF plot results"
 ProjectWindow.registerObjectCommand(OBJCMD_GCTF, createCtfPlot)
 
 
-def _plotCurve(a, i, fn):
-    freqs = _getValues(fn, 0)
-    curv = _getValues(fn, i)
-    a.plot(freqs, curv)
+def _plotCurves(a, curves, fn):
+    data = _loadEPA(fn)
+    if data.size == 0:
+        # Empty log (e.g. Gctf was killed), plot empty curves
+        data = np.empty((max(curves) + 1, 0))
+    freqs = data[0]
+    for i in curves:
+        a.plot(freqs, data[i])
+
+
+def _loadEPA(fn):
+    """ Read all the columns of a Gctf _EPA.log file at once,
+    skipping the header line. """
+    return _loadEPACached(fn, os.path.getmtime(fn))
+
+
+@functools.lru_cache(maxsize=256)
+def _loadEPACached(fn, mtime):
+    """ The modification time is part of the cache key, so the log
+    is read again if Gctf overwrites it. """
+    return np.loadtxt(fn, comments='Resolution', unpack=True, ndmin=2)
 
 
-def _getValues(fn, col):
-    values = list()
-    with open(fn) as f:
-        for line in f:
-            if not line.startswith('Resolution', 2, 12):
-                values.append(float(line.split()[col]))
-    return values
+def _readPsd(psdFn):
+    """ Return the PSD image data, cached while the file is unchanged. """
+    return _readPsdCached(psdFn, os.path.getmtime(psdFn))
+
+
+@functools.lru_cache(maxsize=32)
+def _readPsdCached(psdFn, mtime):
+    return ImageHandler().read(psdFn).getData()
 
 
 def getPlotSubtitle(ctf):
@@ -132,13 +152,8 @@ class CtfEstimationTomoViewerGctf(CtfEstimationTomoViewer):
         plot_title = '%s # %d\n' % (ctfSet.getTsId(), ctfId) + getPlotSubtitle(ctfModel)
         a = xplotter.createSubPlot(plot_title, 'Resolution (Angstroms)', 'CTF')
         a.invert_xaxis()
-        curves = [1, 4, 5]
-
-        for i in curves:
-            _plotCurve(a, i, fn)
-        xplotter.showLegend(['simulated CTF',
-                             'equiphase avg. - bg',
-                             'cross correlation'])
+        _plotCurves(a, EPA_CURVES, fn)
+        xplotter.showLegend(EPA_LEGEND)
         a.grid(True)
 
         return xplotter
@@ -146,12 +161,11 @@ class CtfEstimationTomoViewerGctf(CtfEstimationTomoViewer):
     def plot2D(self, ctfSet, ctfId):
         ctfModel = ctfSet[ctfId]
         psdFn = ctfModel.getPsdFile()
-        img = ImageHandler().read(psdFn)
         fig = Figure(figsize=(7, 7), dpi=100)
         psdPlot = fig.add_subplot(111)
         psdPlot.get_xaxis().set_visible(False)
         psdPlot.get_yaxis().set_visible(False)
         psdPlot.set_title('%s # %d\n' % (ctfSet.getTsId(), ctfId) + getPlotSubtitle(ctfModel))
-        psdPlot.imshow(img.getData(), cmap='gray')
+        psdPlot.imshow(_readPsd(psdFn), cmap='gray')
 
         return fig
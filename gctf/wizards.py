@@ -43,7 +43,8 @@ class GctfCTFWizard(CtfWizard):
         return protParams
     
     def _getProvider(self, protocol):
-        _objs = self._getParameters(protocol)['input']
+        # Only the input pointer is needed, avoid reading the sampling rate again
+        _objs = protocol.inputMicrographs
         return CtfWizard._getListProvider(self, _objs)
 
     def show(self, form):